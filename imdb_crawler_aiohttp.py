@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+@Project    ：IMDBCrawler
+@File       ：imdb_crawler_aiohttp.py
+@Author     ：IronmanJay
+@Date       ：2025/7/6 11:20
+@Describe   ：使用aiohttp（单线程事件循环）对IMDB网站的HTML页面进行爬取
+"""
+
+import os
+import re
+import time
+import random
+import asyncio
+import aiohttp
+
+# 挑战页特征，预编译后对原始bytes单次扫描，免去lower()整页拷贝
+_CHALLENGE_RE = re.compile(rb"awswaf|challenge-container|captcha", re.IGNORECASE)
+
+# ID行特征，一次读入后由正则引擎在C层整体解析
+_ID_RE = re.compile(rb"^tt\d{7,}", re.M)
+
+
+class IMDBCrawler:
+    def __init__(self, imdb_file, output_dir, failed_file, timeout, retry, max_workers, cookie_str):
+        self.root_dir = os.getcwd()
+        self.imdb_file = imdb_file
+        self.done_file = "done.txt"
+        self.output_dir = output_dir
+        self.failed_file = failed_file
+        self.timeout = timeout
+        self.retry = retry
+        self.max_workers = max_workers
+        self.cookie_str = cookie_str
+        self._done_fp = None
+        self.user_agents = [
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15",
+            "Mozilla/5.0 (Windows NT 10.0; WOW64; rv:91.0) Gecko/20100101 Firefox/91.0",
+        ]
+        self.base_headers = {
+            "Accept-Language": "en-US,en;q=0.9",
+            "Referer": "https://www.imdb.com/",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        }
+
+    def read_ids(self):
+        path = os.path.join(self.root_dir, self.imdb_file)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # 整文件一次读入，正则在C层解析，去重同时保持顺序
+            ids = list(dict.fromkeys(m.group(0).decode("ascii") for m in _ID_RE.finditer(data)))
+            print(f"📖 成功读取 {len(ids)} 个 IMDb ID")
+            return ids
+        except Exception as e:
+            print(f"❌ 读取 IMDb ID 失败: {e}")
+            return []
+
+    def mark_done(self, imdb_id):
+        """
+        将已完成的ID追加写入完成日志（事件循环单线程，无需加锁）
+        """
+        self._done_fp.write(imdb_id + "\n")
+
+    def finalize_id_file(self):
+        """
+        程序结束时根据完成日志一次性重写ID文件
+        """
+        path = os.path.join(self.root_dir, self.imdb_file)
+        done_path = os.path.join(self.root_dir, self.done_file)
+        try:
+            with open(done_path, "r", encoding="utf-8") as f:
+                done = {line.strip() for line in f if line.strip()}
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            # 先写临时文件再原子替换，中途崩溃不会留下半截ID文件
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write("".join(line for line in lines if line.strip() not in done))
+            os.replace(path + ".tmp", path)
+            print(f"🧹 ID 文件已重写，共剔除 {len(done)} 个已完成 ID")
+        except Exception as e:
+            print(f"❌ 重写 ID 文件失败: {e}")
+
+    def save_html(self, html, imdb_id):
+        path = os.path.join(self.output_dir, f"{imdb_id}.html")
+        # 先写临时文件，成功后原子改名，不留半截HTML
+        with open(path + ".tmp", "wb") as f:
+            f.write(html)
+        os.replace(path + ".tmp", path)
+        print(f"✅ [{imdb_id}] HTML 保存成功")
+
+    def is_challenge_page(self, html):
+        return bool(_CHALLENGE_RE.search(html))
+
+    async def fetch_page(self, session, imdb_id):
+        """
+        抓取单个IMDB页面
+        :param session: 共享的aiohttp会话
+        :param imdb_id: IMDB页面对应的ID
+        :return: 页面bytes，失败返回None
+        """
+        url = f"https://www.imdb.com/title/{imdb_id}/plotsummary/"
+        for attempt in range(1, self.retry + 1):
+            try:
+                headers = {"User-Agent": random.choice(self.user_agents)}
+                print(f"🌐 请求 {imdb_id} 第{attempt}次")
+                async with session.get(url, headers=headers) as res:
+                    if res.status != 200:
+                        raise Exception(f"HTTP状态码异常: {res.status}")
+                    # WAF挑战响应自带特征头且远小于正常页面，
+                    # 先看头再看首块，命中时不再拉取剩余body
+                    if "x-amzn-waf-action" in res.headers:
+                        raise Exception("响应头携带WAF挑战标记")
+                    first = await res.content.read(1 << 16)
+                    if self.is_challenge_page(first):
+                        raise Exception("页面疑似反爬挑战")
+                    body = first + await res.content.read()
+                return body
+            except Exception as e:
+                print(f"⚠️ 第{attempt}次请求失败: {e}")
+                if attempt < self.retry:
+                    await asyncio.sleep(3 + attempt * 2 + random.uniform(0.5, 2.5))
+        return None
+
+    async def worker(self, session, semaphore, imdb_id):
+        """
+        单个ID的抓取+保存任务
+        """
+        async with semaphore:
+            try:
+                body = await self.fetch_page(session, imdb_id)
+                if body:
+                    # 磁盘写交给线程，避免阻塞事件循环
+                    await asyncio.to_thread(self.save_html, body, imdb_id)
+                    self.mark_done(imdb_id)
+                    return None
+                return imdb_id
+            except Exception as e:
+                print(f"❌ [{imdb_id}] 爬取异常: {e}")
+                return imdb_id
+
+    async def main(self):
+        print("=" * 60)
+        print("🚀 IMDb aiohttp 爬虫启动")
+        print("=" * 60)
+        ids = self.read_ids()
+        if not ids:
+            print("⚠️ 无可用 ID，退出")
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._done_fp = open(os.path.join(self.root_dir, self.done_file), "a",
+                             buffering=1 << 16, encoding="utf-8")
+        start = time.time()
+
+        # 单个连接池覆盖所有并发请求，连接跨ID复用
+        connector = aiohttp.TCPConnector(limit=64, limit_per_host=16, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers=self.base_headers,
+                                         cookies={"at-main": self.cookie_str}) as session:
+            semaphore = asyncio.Semaphore(self.max_workers)
+            results = await asyncio.gather(
+                *[self.worker(session, semaphore, imdb_id) for imdb_id in ids],
+                return_exceptions=False)
+
+        failed = [r for r in results if r]
+
+        self._done_fp.close()
+        self.finalize_id_file()
+
+        print("\n📊 总计: ", len(ids))
+        print("✅ 成功: ", len(ids) - len(failed))
+        print("❌ 失败: ", len(failed))
+        print(f"⏱️ 耗时: {int(time.time() - start)} 秒")
+
+        if failed:
+            with open(self.failed_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(failed))
+            print(f"📁 失败 ID 已保存到: {self.failed_file}")
+
+        input("\n🎉 所有任务完成！按 Enter 退出...")
+
+
+if __name__ == "__main__":
+    crawler = IMDBCrawler(
+        imdb_file="data.txt",
+        output_dir=r"D:\debug_results",
+        failed_file="failed_ids.txt",
+        timeout=30,
+        retry=5,
+        max_workers=12,
+        cookie_str="REPLACE_WITH_IMDB_COOKIE"
+    )
+    asyncio.run(crawler.main())
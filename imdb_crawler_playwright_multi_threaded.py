@@ -10,12 +10,34 @@
 """
 
 import os
+import re
 import time
 import random
 import asyncio
 import traceback
+import concurrent.futures
 from playwright.async_api import async_playwright
 
+# Linux下caio可以把写请求批量提交给内核(io_uring)；不可用时回退线程池写
+try:
+    from caio import AsyncioContext as _CaioContext
+except ImportError:
+    _CaioContext = None
+
+# 挑战页特征，预编译后免去对整页做lower()拷贝
+_CHALLENGE_RE = re.compile(rb"awswaf|challenge-container", re.IGNORECASE)
+
+# ID行特征，一次读入后由正则引擎在C层整体解析
+_ID_RE = re.compile(rb"^tt\d{7,}", re.M)
+
+# 模拟的浏览器User-Agent，整个上下文只设置一次
+_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+               "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36")
+
+# 需要拦截的资源类型，模块级frozenset，路由回调里O(1)查找且不再逐次重建
+_BLOCKED_RESOURCE_TYPES = frozenset({
+    "image", "stylesheet", "font", "media", "websocket", "manifest", "other"})
+
 
 class IMDBCrawler:
     def __init__(self):
@@ -23,11 +45,22 @@ class IMDBCrawler:
         self.IMDB_ID_FILE = "data_part2.txt"
         self.OUTPUT_DIR = r"/Users/ironmanjay/data"
         self.FAILED_FILE = "failed_ids.txt"
+        self.JOURNAL_FILE = "done_ids.txt"
         self.RETRY_COUNT = 2
         self.CONCURRENCY = 6
         self.TIMEOUT = 10000
         self.playwright = None
         self.browser = None
+        self.context = None
+        self.page_pool = None
+        self._journal = None
+        self._journal_lock = None
+        self._done_q = None
+        self._flush_task = None
+        self._io_executor = None
+        self._aio = None
+        # 独立RNG实例，不经过random模块的全局实例
+        self._rng = random.Random()
 
     def read_imdb_ids_from_file(self):
         """
@@ -36,127 +69,245 @@ class IMDBCrawler:
         """
         filepath = os.path.join(self.ROOT_DIR, self.IMDB_ID_FILE)
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                return [line.strip() for line in f if line.strip().startswith("tt")]
+            with open(filepath, "rb") as f:
+                data = f.read()
+            # 整文件一次读入，正则在C层解析，去重同时保持顺序
+            return list(dict.fromkeys(m.group(0).decode("ascii") for m in _ID_RE.finditer(data)))
         except Exception as e:
             print(f"读取 IMDb ID 失败: {e}")
             return []
 
-    def remove_id_from_file(self, imdb_id):
+    def mark_done(self, imdb_id):
         """
-        删除已经爬取完毕的ID
+        将已完成的ID放入待刷盘队列
         :param imdb_id: IMDB的HTML页面对应的ID
-        :return: 删除结果
+        :return: None
+        """
+        self._done_q.put_nowait(imdb_id)
+
+    async def _flush_done(self):
         """
+        将队列中积累的ID一次性写入进度日志
+        :return: None
+        """
+        ids = []
+        while not self._done_q.empty():
+            ids.append(self._done_q.get_nowait())
+        if ids:
+            data = "".join(i + "\n" for i in ids)
+            async with self._journal_lock:
+                await asyncio.to_thread(self._journal.write, data)
+
+    async def _flusher(self):
+        """
+        后台协程，周期性批量刷盘
+        :return: None
+        """
+        while True:
+            await asyncio.sleep(0.1)
+            await self._flush_done()
+
+    def rewrite_id_file(self):
+        """
+        根据进度日志一次性重写ID文件
+        :return: None
+        """
+        journal_path = os.path.join(self.ROOT_DIR, self.JOURNAL_FILE)
         filepath = os.path.join(self.ROOT_DIR, self.IMDB_ID_FILE)
         try:
+            with open(journal_path, "r", encoding="utf-8") as f:
+                done_ids = {line.strip() for line in f if line.strip()}
             with open(filepath, "r", encoding="utf-8") as f:
                 lines = f.readlines()
-            new_lines = [line for line in lines if line.strip() != imdb_id]
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.writelines(new_lines)
+            new_lines = [line for line in lines if line.strip() not in done_ids]
+            # 先写临时文件再原子替换，中途崩溃不会留下半截ID文件
+            with open(filepath + ".tmp", "w", encoding="utf-8") as f:
+                # 预先join成一个缓冲区，一次写入
+                f.write("".join(new_lines))
+            os.replace(filepath + ".tmp", filepath)
         except Exception as e:
-            print(f"移除 ID 失败: {imdb_id} - {e}")
+            print(f"重写 ID 文件失败: {e}")
             traceback.print_exc()
 
-    async def is_challenge_page(self, html: str):
+    def is_challenge_page(self, body: bytes):
         """
-        挑战页判断
-        :param html: HTML页面
+        挑战页判断，特征都出现在页面开头，只扫描前8KB
+        :param body: HTTP响应原始字节
         :return: 是否是挑战页
         """
-        return "awswaf" in html.lower() or "challenge-container" in html.lower()
+        return bool(_CHALLENGE_RE.search(body[:8192]))
 
-    async def save_html(self, content: str, imdb_id: str):
+    async def save_html(self, content: bytes, imdb_id: str):
         """
         保存爬取的HTML页面
-        :param content: HTML页面内容
+        :param content: HTML页面原始字节
         :param imdb_id: IMDB的HTML页面ID
         :return: 保存结果
         """
-        os.makedirs(self.OUTPUT_DIR, exist_ok=True)
         path = os.path.join(self.OUTPUT_DIR, f"{imdb_id}.html")
+        # 先写临时文件，成功后原子改名，不会留下半截HTML冒充成功结果
+        tmp = path + ".tmp"
 
-        def write_file():
-            """
-            读取文件
-            :return: 读取结果
-            """
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
+        if self._aio is not None:
+            # io_uring路径：写请求在内核侧批量提交；
+            # 短写时循环续写，确认写满后才原子改名
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                offset = 0
+                while offset < len(content):
+                    written = await self._aio.write(content[offset:], fd, offset)
+                    if written <= 0:
+                        raise OSError(f"io_uring写入失败: 返回 {written}")
+                    offset += written
+            finally:
+                os.close(fd)
+            os.replace(tmp, path)
+        else:
+            def write_file():
+                """
+                写入文件，直接走os.write省掉缓冲层的一次拷贝，短写时循环续写
+                :return: 写入结果
+                """
+                fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    offset = 0
+                    while offset < len(content):
+                        offset += os.write(fd, content[offset:])
+                finally:
+                    os.close(fd)
+                os.replace(tmp, path)
 
-        await asyncio.to_thread(write_file)
+            await asyncio.get_running_loop().run_in_executor(self._io_executor, write_file)
         print(f"✅ [{imdb_id}] 已保存: {path}")
 
     async def setup_browser(self):
         """
-        设置浏览器
+        设置浏览器，所有协程共享一个浏览器上下文
         :return: None
         """
+        # 输出目录只创建一次，省掉每次保存的stat系统调用
+        os.makedirs(self.OUTPUT_DIR, exist_ok=True)
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(headless=True)
+        self.context = await self.browser.new_context(user_agent=_USER_AGENT)
+        # 资源拦截安装在上下文级别，只需注册一次
+        await self.context.route("**/*", lambda route: route.abort()
+                                 if route.request.resource_type in _BLOCKED_RESOURCE_TYPES
+                                 else route.continue_())
+        # 广告与统计域名直接丢弃
+        await self.context.route(re.compile(r"doubleclick|googletagmanager|amazon-adsystem|scorecardresearch"),
+                                 lambda route: route.abort())
+        # 进度日志只打开一次，成功的ID以追加方式记录
+        self._journal = open(os.path.join(self.ROOT_DIR, self.JOURNAL_FILE), "a",
+                             buffering=65536, encoding="utf-8")
+        self._journal_lock = asyncio.Lock()
+        # 后台刷盘协程，把每个ID一次写盘合并为批量写盘
+        self._done_q = asyncio.Queue()
+        self._flush_task = asyncio.create_task(self._flusher())
+        # 专用写盘线程池，避免和默认线程池的其他任务争抢
+        self._io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        if _CaioContext is not None:
+            self._aio = _CaioContext(max_requests=32)
+        # 预热固定数量的页面，复用代替每个ID重建
+        self.page_pool = asyncio.Queue()
+        for _ in range(self.CONCURRENCY):
+            self.page_pool.put_nowait(await self._new_pooled_page())
+
+    async def _new_pooled_page(self):
+        """
+        创建一个带广告拦截的池化页面
+        :return: 页面实例
+        """
+        page = await self.context.new_page()
+        # 广告域名同时在浏览器进程内拦截，省去每个子请求回调到Python
+        cdp = await self.context.new_cdp_session(page)
+        await cdp.send("Network.setBlockedURLs", {"urls": [
+            "*doubleclick*", "*googletagmanager*", "*amazon-adsystem*", "*scorecardresearch*"]})
+        await cdp.send("Network.enable", {})
+        return page
 
     async def close_browser(self):
         """
         关闭浏览器
         :return: None
         """
+        await self.context.close()
         await self.browser.close()
         await self.playwright.stop()
 
-    async def create_context(self):
-        """
-        模拟用户请求
-        :return: 模拟结果
-        """
-        return await self.browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                       "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-        )
-
-    async def fetch_one(self, semaphore, imdb_id):
+    async def fetch_one(self, imdb_id):
         """
         提取页面内容
-        :param semaphore: 锁
         :param imdb_id: IMDB页面对应的ID
         :return: IMDB页面对应的ID
         """
         url = f"https://www.imdb.com/title/{imdb_id}/plotsummary/"
-        async with semaphore:
-            try:
-                context = await self.create_context()
-                page = await context.new_page()
-                await page.route("**/*", lambda route: route.abort() if route.request.resource_type in [
-                    "image", "stylesheet", "font"] else route.continue_())
-
-                for attempt in range(1, self.RETRY_COUNT + 1):
-                    try:
-                        await page.goto(url, timeout=30000, wait_until="domcontentloaded")
+        page = await self.page_pool.get()
+        try:
+            for attempt in range(1, self.RETRY_COUNT + 1):
+                try:
+                    # commit在收到响应后立即返回，不等DOMContentLoaded
+                    response = await page.goto(url, timeout=30000, wait_until="commit")
+                    body = await response.body()
+
+                    if self.is_challenge_page(body):
+                        response = await page.reload(timeout=self.TIMEOUT)
+                        body = await response.body()
+                        if self.is_challenge_page(body):
+                            raise Exception("仍为挑战页")
+
+                    # 原始响应缺少剧情区块时才回退到等待渲染结果
+                    if b"summaries" not in body:
                         await page.wait_for_selector("#summaries", timeout=5000)
-                        html = await page.content()
-
-                        if await self.is_challenge_page(html):
-                            await page.reload(timeout=self.TIMEOUT)
-                            html = await page.content()
-                            if await self.is_challenge_page(html):
-                                raise Exception("仍为挑战页")
-
-                        await self.save_html(html, imdb_id)
-                        self.remove_id_from_file(imdb_id)
-                        await context.close()
-                        return None
-                    except Exception as e:
-                        print(f"❌ [{imdb_id}] 第{attempt}次失败: {e}")
-                        if attempt < self.RETRY_COUNT:
-                            wait = 2 + attempt * 2 + random.uniform(0.5, 1.5)
-                            print(f"⏳ 等待 {wait:.1f}s 后重试...")
-                            await asyncio.sleep(wait)
-
-                await context.close()
-                return imdb_id
-            except Exception as e:
-                print(f"❌ [{imdb_id}] 爬取失败: {e}")
-                return imdb_id
+                        body = (await page.content()).encode("utf-8")
+
+                    await self.save_html(body, imdb_id)
+                    self.mark_done(imdb_id)
+                    return None
+                except Exception as e:
+                    print(f"❌ [{imdb_id}] 第{attempt}次失败: {e}")
+                    if attempt < self.RETRY_COUNT:
+                        # 抖动只在确实要重试时才计算
+                        wait = 2 + attempt * 2 + self._rng.uniform(0.5, 1.5)
+                        print(f"⏳ 等待 {wait:.1f}s 后重试...")
+                        await asyncio.sleep(wait)
+
+            return imdb_id
+        except Exception as e:
+            print(f"❌ [{imdb_id}] 爬取失败: {e}")
+            return imdb_id
+        finally:
+            # 清空DOM释放内存，然后归还页面到池中；
+            # 页面已崩溃或重置失败时换一个新页面回池，避免坏页面拖垮后续ID
+            try:
+                await page.goto("about:blank")
+                healthy = not page.is_closed()
+            except Exception:
+                healthy = False
+            if not healthy:
+                print("⚠️ 页面已失效，重建后归还页面池...")
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                page = await self._new_pooled_page()
+            self.page_pool.put_nowait(page)
+
+    async def fetch_worker(self, work_q, failed_ids):
+        """
+        工作协程，不断从队列领取ID直到队列耗尽
+        :param work_q: 待处理ID队列
+        :param failed_ids: 失败ID列表（共享）
+        :return: None
+        """
+        while True:
+            try:
+                imdb_id = work_q.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            result = await self.fetch_one(imdb_id)
+            if result:
+                failed_ids.append(result)
 
     async def main(self):
         """
@@ -168,6 +319,16 @@ class IMDBCrawler:
         print("=" * 60)
 
         imdb_ids = self.read_imdb_ids_from_file()
+
+        # 跳过输出目录里已经存在的页面，重启后不再重复抓取
+        if os.path.isdir(self.OUTPUT_DIR):
+            done = {f[:-5] for f in await asyncio.to_thread(os.listdir, self.OUTPUT_DIR)
+                    if f.endswith(".html")}
+            if done:
+                before = len(imdb_ids)
+                imdb_ids = [i for i in imdb_ids if i not in done]
+                print(f"⏭️ 已存在 {before - len(imdb_ids)} 个页面，跳过")
+
         if not imdb_ids:
             print("⚠️ 没有可处理的 ID，退出")
             return
@@ -175,13 +336,32 @@ class IMDBCrawler:
         await self.setup_browser()
         start = time.time()
 
-        semaphore = asyncio.Semaphore(self.CONCURRENCY)
-        tasks = [self.fetch_one(semaphore, imdb_id) for imdb_id in imdb_ids]
-        results = await asyncio.gather(*tasks)
-        failed_ids = [r for r in results if r]
+        # 固定CONCURRENCY个工作协程消费队列，存活任务数O(并发度)而不是O(N)
+        work_q = asyncio.Queue()
+        for imdb_id in imdb_ids:
+            work_q.put_nowait(imdb_id)
+        failed_ids = []
+        await asyncio.gather(*[
+            self.fetch_worker(work_q, failed_ids) for _ in range(self.CONCURRENCY)
+        ])
 
         await self.close_browser()
 
+        # 停止刷盘协程，把剩余队列内容落盘
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        await self._flush_done()
+        self._io_executor.shutdown(wait=True)
+        if self._aio is not None:
+            self._aio.close()
+
+        # 关闭日志并根据其内容一次性重写ID文件
+        self._journal.close()
+        self.rewrite_id_file()
+
         print("\n📊 总数: ", len(imdb_ids))
         print("✅ 成功: ", len(imdb_ids) - len(failed_ids))
         print("❌ 失败: ", len(failed_ids))
@@ -196,5 +376,11 @@ class IMDBCrawler:
 
 
 if __name__ == "__main__":
+    # uvloop可用时替换默认事件循环，纯I/O负载下吞吐更高
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     crawler = IMDBCrawler()
     asyncio.run(crawler.main())
@@ -6,14 +6,28 @@
 @File       ：imdb_crawler_playwright_single_threaded.py
 @Author     ：IronmanJay
 @Date       ：2025/7/4 17:21
-@Describe   ：使用Playwright（单线程）对IMDB网站的HTML页面进行爬取
+@Describe   ：使用Playwright（单进程，多页面流水线）对IMDB网站的HTML页面进行爬取
 """
 
 import os
+import re
 import time
-import traceback
-from playwright.sync_api import sync_playwright
 import random
+import asyncio
+import traceback
+from playwright.async_api import async_playwright
+
+# 挑战页特征，预编译后免去对整页做lower()拷贝
+_CHALLENGE_RE = re.compile(r"awswaf|challenge-container", re.IGNORECASE)
+
+# ID行特征，一次读入后由正则引擎在C层整体解析
+_ID_RE = re.compile(rb"^tt\d{7,}", re.M)
+
+# 需要拦截的资源类型，模块级frozenset，路由回调里O(1)查找且不再逐次重建
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "stylesheet", "media", "websocket"})
+
+# 已知的广告统计域名，按URL子串拦截
+_BLOCKED_HOSTS = ("doubleclick", "google-analytics", "amazon-adsystem")
 
 
 class IMDBCrawler:
@@ -22,12 +36,18 @@ class IMDBCrawler:
         self.IMDB_ID_FILE = "data.txt"
         self.OUTPUT_DIR = "debug_results"
         self.FAILED_FILE = "failed_ids.txt"
+        self.DONE_FILE = "done_ids.txt"
         self.TIMEOUT = 10000  # 页面加载超时(ms)
         self.RETRY_COUNT = 2  # 最大重试次数
         self.HEADLESS = True  # 是否无头浏览器
+        self.CONCURRENCY = 8  # 同时在途的页面数
+        self.playwright = None
         self.browser = None
         self.context = None
-        self.page = None
+        self.pages = []
+        # 独立RNG实例，不经过random模块的全局实例
+        self._rng = random.Random()
+        self._done_fp = None
 
         # 设置浏览器启动参数
         self.browser_args = [
@@ -53,14 +73,13 @@ class IMDBCrawler:
         """
         filename = filename or self.IMDB_ID_FILE
         filepath = os.path.join(self.ROOT_DIR, filename)
-        imdb_ids = []
         try:
             print(f"🔍 尝试从文件 {filepath} 读取IMDb ID列表...")
-            with open(filepath, "r", encoding="utf-8") as file:
-                for line in file:
-                    line = line.strip()
-                    if line.startswith("tt") and len(line) >= 9:
-                        imdb_ids.append(line)
+            with open(filepath, "rb") as file:
+                data = file.read()
+            # 整文件一次读入，正则在C层解析，去重同时保持顺序
+            imdb_ids = list(dict.fromkeys(
+                m.group(0).decode("ascii") for m in _ID_RE.finditer(data)))
 
             if not imdb_ids:
                 raise ValueError("⚠️ 文件为空或未找到有效的IMDb ID")
@@ -90,156 +109,233 @@ class IMDBCrawler:
             print(f"✅ 已从 {filepath} 中成功移除ID: {imdb_id}")
             return True
         except Exception as e:
-            print(f"❌ 从 {filepath} 中移除ID失败: {imdb_id}, 原因: {str(e)}")
-            traceback.print_exc()
+            # 热路径上只打印简短摘要，完整堆栈放在调试开关后面
+            print(f"❌ 从 {filepath} 中移除ID失败: {imdb_id}, 原因: {e!r}")
+            if os.environ.get("IMDB_DEBUG"):
+                traceback.print_exc()
             return False
 
-    def save_html(self, imdb_id):
+    def mark_done(self, imdb_id):
+        """
+        将已完成的ID追加写入完成日志
+        :param imdb_id: IMDB页面对应的ID
+        :return: None
+        """
+        self._done_fp.write(imdb_id + "\n")
+
+    def rewrite_id_file(self):
+        """
+        根据完成日志一次性重写ID文件
+        :return: None
+        """
+        done_path = os.path.join(self.ROOT_DIR, self.DONE_FILE)
+        filepath = os.path.join(self.ROOT_DIR, self.IMDB_ID_FILE)
+        try:
+            with open(done_path, "r", encoding="utf-8") as f:
+                done_ids = {line.strip() for line in f if line.strip()}
+            with open(filepath, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            # 先写临时文件再原子替换，中途崩溃不会留下半截ID文件
+            with open(filepath + ".tmp", "w", encoding="utf-8") as f:
+                f.write("".join(line for line in lines if line.strip() not in done_ids))
+            os.replace(filepath + ".tmp", filepath)
+            print(f"🧹 ID文件已重写，共剔除 {len(done_ids)} 个已完成ID")
+        except Exception as e:
+            print(f"❌ 重写ID文件失败: {e!r}")
+
+    def save_html(self, html, imdb_id):
         html_path = os.path.join(self.OUTPUT_DIR, f"{imdb_id}.html")
-        os.makedirs(self.OUTPUT_DIR, exist_ok=True)
-        content = self.page.content()
 
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        # 一次性编码成bytes，先写临时文件再原子改名
+        data = html.encode("utf-8")
+        with open(html_path + ".tmp", "wb", buffering=1 << 20) as f:
+            f.write(data)
+        os.replace(html_path + ".tmp", html_path)
 
         print(f"💾 [{imdb_id}] 已保存到: {html_path}")
         return html_path
 
-    def is_challenge_page(self, html=None):
-        if html is None:
-            html = self.page.content()
-        return "awswaf" in html.lower() or "challenge-container" in html.lower()
+    def is_challenge_page(self, html):
+        return bool(_CHALLENGE_RE.search(html))
 
-    def setup_browser(self):
+    async def setup_browser(self):
         """
-        初始化浏览器环境
+        初始化浏览器环境，一个共享上下文加固定数量的页面
         :return: None
         """
         print("🔧 正在初始化浏览器环境...")
-        playwright = sync_playwright().start()
-        self.browser = playwright.chromium.launch(
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(
             headless=self.HEADLESS,
             args=self.browser_args
         )
 
         print("🧩 创建新浏览器上下文...")
-        self.context = self.browser.new_context()
+        self.context = await self.browser.new_context()
+
+        # headers在上下文级别设置一次，所有页面自动继承
+        await self.context.set_extra_http_headers(self.browser_headers)
 
         # 拦截不必要资源，加快加载速度
-        self.context.route("**/*", lambda route:
-        route.abort() if route.request.resource_type in ["image", "font", "stylesheet"]
+        await self.context.route("**/*", lambda route:
+        route.abort() if (route.request.resource_type in _BLOCKED_RESOURCE_TYPES
+                          or any(host in route.request.url for host in _BLOCKED_HOSTS))
         else route.continue_())
 
-        print("📄 创建新页面...")
-        self.page = self.context.new_page()
-
-        # 设置全局headers
-        self.page.set_extra_http_headers(self.browser_headers)
+        print(f"📄 创建 {self.CONCURRENCY} 个页面...")
+        for _ in range(self.CONCURRENCY):
+            self.pages.append(await self.context.new_page())
+
+        # 每个页面先整页访问一次首页：种下cookie、让浏览器完成WAF的JS挑战，
+        # 并把页面停在imdb.com源上，后续页面内fetch即为同源请求
+        print("🌱 预热页面以获取站点cookie...")
+        await asyncio.gather(*[
+            page.goto("https://www.imdb.com/", wait_until="domcontentloaded",
+                      timeout=self.TIMEOUT)
+            for page in self.pages
+        ], return_exceptions=True)
         print("✅ 浏览器环境初始化完成")
 
-    def close_browser(self):
+    async def close_browser(self):
         """
         关闭浏览器环境
         :return: None
         """
-        if self.page:
-            print("🛑 正在关闭页面...")
-            self.page.close()
+        for page in self.pages:
+            await page.close()
+        self.pages = []
         if self.context:
             print("🛑 正在关闭浏览器上下文...")
-            self.context.close()
+            await self.context.close()
         if self.browser:
             print("🛑 正在关闭浏览器...")
-            self.browser.close()
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
         print("✅ 浏览器环境已关闭")
 
-    def fetch_imdb_page(self, imdb_id):
+    async def fetch_imdb_page(self, page, imdb_id):
         """
         抓取单个IMDB页面
+        :param page: 执行抓取的页面
         :param imdb_id: IMDB页面对应的ID
-        :return: 抓取结果
+        :return: 抓取到的HTML，失败返回None
         """
         url = f"https://www.imdb.com/title/{imdb_id}/plotsummary/"
 
-        print(f"\n{'=' * 60}")
-        print(f"🌐 [{imdb_id}] 开始处理")
-        print(f"🔗 目标URL: {url}")
-        print(f"🔄 最大重试次数: {self.RETRY_COUNT}")
-        print('=' * 60)
+        print(f"🌐 [{imdb_id}] 开始处理: {url}")
 
         for attempt in range(1, self.RETRY_COUNT + 1):
             try:
                 print(f"📡 [{imdb_id}] 第{attempt}次访问")
-                self.page.goto(url, timeout=self.TIMEOUT)
-
-                # 尝试检测目标元素
+                # 页面停在imdb.com源上，直接在页面内fetch：一次HTTP往返
+                # 拿到HTML，跳过布局、JS执行和子资源加载
                 try:
-                    self.page.wait_for_selector("#summaries", timeout=5000)
-                except Exception:
-                    print(f"⚠️ [{imdb_id}] 剧情区块加载异常，将继续保存HTML")
-
-                # 检查是否是验证页面
-                if self.is_challenge_page():
-                    print(f"⚠️ [{imdb_id}] 检测到挑战页面，刷新重试...")
-                    self.page.reload(timeout=self.TIMEOUT)
-                    self.page.wait_for_selector('div[data-testid="sub-section-summaries"]', timeout=8000)
-                    if self.is_challenge_page():
-                        raise Exception("⛔ 刷新后仍然是挑战页")
-
-                return True
+                    html = await page.evaluate(
+                        "async u => (await fetch(u, {credentials: 'include', "
+                        "headers: {'Accept': 'text/html'}})).text()", url)
+                    need_navigation = self.is_challenge_page(html)
+                    if need_navigation:
+                        print(f"⚠️ [{imdb_id}] 检测到挑战页面，回退整页导航...")
+                except Exception as e:
+                    # 预热失败时页面停在about:blank，同源假设不成立，
+                    # fetch本身会被拒；此时同样回退整页导航
+                    print(f"⚠️ [{imdb_id}] 页面内fetch失败({e})，回退整页导航...")
+                    need_navigation = True
+
+                # 整页导航让浏览器执行WAF的JS挑战，同时把页面重新停回imdb.com源
+                if need_navigation:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=self.TIMEOUT)
+                    html = await page.content()
+                    if 'id="summaries"' not in html:
+                        try:
+                            await page.wait_for_selector("#summaries", timeout=3000)
+                            html = await page.content()
+                        except Exception:
+                            print(f"⚠️ [{imdb_id}] 剧情区块加载异常，将继续保存HTML")
+                    if self.is_challenge_page(html):
+                        raise Exception("⛔ 整页导航后仍然是挑战页")
+
+                return html
             except Exception as e:
                 print(f"❌ [{imdb_id}] 尝试{attempt}失败: {str(e)}")
                 if attempt < self.RETRY_COUNT:
+                    # 抖动只在确实要重试时才计算
                     wait_sec = 3 + attempt * 2
-                    jitter = random.uniform(0.5, 2.5)  # 增加抖动防止节奏规律
+                    jitter = self._rng.uniform(0.5, 2.5)  # 增加抖动防止节奏规律
                     total_wait = wait_sec + jitter
                     print(f"😴 访问失败，等待 {total_wait:.1f}秒后重试...")
-                    time.sleep(total_wait)
+                    await asyncio.sleep(total_wait)
+
+        return None
+
+    async def fetch_worker(self, page, queue, failed_ids, total):
+        """
+        单个页面的工作协程，不断从队列领取ID处理
+        :param page: 本协程专用的页面
+        :param queue: 待处理ID队列
+        :param failed_ids: 失败ID列表（共享）
+        :param total: 总任务数
+        :return: None
+        """
+        while True:
+            try:
+                index, imdb_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
 
-        return False
+            print(f"\n📥 处理进度: [{index + 1}/{total}] - ID: {imdb_id}")
+            try:
+                html = await self.fetch_imdb_page(page, imdb_id)
+                if html:
+                    self.save_html(html, imdb_id)
+                    self.mark_done(imdb_id)
+                    print(f"✅ [{imdb_id}] 处理成功")
+                else:
+                    print(f"⛔ [{imdb_id}] 处理失败")
+                    failed_ids.append(imdb_id)
+            except Exception as e:
+                print(f"🔥 处理 {imdb_id} 时发生未捕获异常: {e}")
+                traceback.print_exc()
+                failed_ids.append(imdb_id)
 
-    def fetch_all_sequential(self):
+    async def fetch_all_concurrent(self, imdb_ids):
         """
-        顺序抓取所有IMDB页面
-        :return: 抓取结果
+        以固定页面数的流水线抓取所有IMDB页面
+        :param imdb_ids: 待抓取的ID列表
+        :return: 失败的ID列表
         """
         print("\n" + "=" * 60)
-        print("🚀 开始顺序抓取所有IMDB页面")
+        print(f"🚀 开始抓取所有IMDB页面（{self.CONCURRENCY} 个页面并行）")
         print("=" * 60)
 
-        imdb_ids = self.read_imdb_ids_from_file()
-        if not imdb_ids:
-            print("⚠️ 无有效IMDb ID，退出")
-            return []
-
         os.makedirs(self.OUTPUT_DIR, exist_ok=True)
         failed_ids = []
         total = len(imdb_ids)
 
         # 初始化浏览器环境
-        self.setup_browser()
+        await self.setup_browser()
+
+        # 完成日志只打开一次，成功的ID以追加方式记录
+        self._done_fp = open(os.path.join(self.ROOT_DIR, self.DONE_FILE), "a",
+                             buffering=1 << 16, encoding="utf-8")
 
         start_time = time.time()
 
+        queue = asyncio.Queue()
         for index, imdb_id in enumerate(imdb_ids):
-            print(f"\n📥 处理进度: [{index + 1}/{total}] - ID: {imdb_id}")
+            queue.put_nowait((index, imdb_id))
 
-            try:
-                success = self.fetch_imdb_page(imdb_id)
-                if success:
-                    self.save_html(imdb_id)
-                    self.remove_id_from_file(imdb_id)
-                    print(f"✅ [{imdb_id}] 处理成功")
-                else:
-                    print(f"⛔ [{imdb_id}] 处理失败")
-                    failed_ids.append(imdb_id)
-            except Exception as e:
-                print(f"🔥 处理 {imdb_id} 时发生未捕获异常: {e}")
-                traceback.print_exc()
-                failed_ids.append(imdb_id)
+        await asyncio.gather(*[
+            self.fetch_worker(page, queue, failed_ids, total) for page in self.pages
+        ])
 
         # 关闭浏览器环境
-        self.close_browser()
+        await self.close_browser()
+
+        # 关闭完成日志并一次性回写ID文件
+        self._done_fp.close()
+        self.rewrite_id_file()
 
         elapsed_time = time.time() - start_time
         print(f"\n⏱️ 总耗时: {elapsed_time:.2f}秒")
@@ -252,7 +348,7 @@ class IMDBCrawler:
         :return: None
         """
         print("=" * 60)
-        print("🚀 IMDb批量HTML保存器（单进程顺序版）")
+        print("🚀 IMDb批量HTML保存器（单进程流水线版）")
         print("=" * 60)
 
         imdb_ids = self.read_imdb_ids_from_file()
@@ -263,7 +359,7 @@ class IMDBCrawler:
         print(f"📝 准备处理 {len(imdb_ids)} 个IMDB ID")
 
         start = time.time()
-        failed_ids = self.fetch_all_sequential()
+        failed_ids = asyncio.run(self.fetch_all_concurrent(imdb_ids))
 
         print("\n📊 处理结果统计:")
         print("=" * 30)
@@ -283,5 +379,11 @@ class IMDBCrawler:
 
 
 if __name__ == "__main__":
+    # uvloop可用时替换默认事件循环，纯I/O负载下吞吐更高
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     crawler = IMDBCrawler()
     crawler.run()
@@ -10,137 +10,285 @@
 """
 
 import os
+import re
 import time
+import heapq
+import queue
 import random
-import requests
+import httpx
+import logging
+import itertools
 import threading
+import logging.handlers
 import concurrent.futures
+from types import MappingProxyType
+
+# 挑战页特征，预编译后对原始bytes单次扫描，免去lower()整页拷贝
+_CHALLENGE_RE = re.compile(rb"awswaf|challenge-container|captcha", re.IGNORECASE)
+
+# ID行特征，一次读入后由正则引擎在C层整体解析
+_ID_RE = re.compile(rb"^tt\d{7,}", re.M)
+
+# 进度日志先进内存缓冲，攒满512条或出现WARNING及以上才真正写stdout，
+# 多线程下不再为每条进度行争抢sys.stdout锁
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+_memory_handler = logging.handlers.MemoryHandler(
+    512, flushLevel=logging.WARNING, target=_stream_handler)
+log = logging.getLogger(__name__)
+log.setLevel(logging.INFO)
+log.addHandler(_memory_handler)
 
 
 class IMDBCrawler:
+    # 固定headers模板与UA元组放在类级，进程内只构造一次
+    _BASE_HEADERS = MappingProxyType({
+        "Accept-Language": "en-US,en;q=0.9",
+        "Referer": "https://www.imdb.com/",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    })
+    _USER_AGENTS = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15",
+        "Mozilla/5.0 (Windows NT 10.0; WOW64; rv:91.0) Gecko/20100101 Firefox/91.0",
+    )
+
     def __init__(self, imdb_file, output_dir, failed_file, timeout, retry, max_workers, cookie_str):
         self.root_dir = os.getcwd()
         self.imdb_file = imdb_file
+        self.done_file = "done.txt"
+        # 路径只拼接一次，热路径直接取用
+        self._data_path = os.path.join(self.root_dir, imdb_file)
+        self._done_path = os.path.join(self.root_dir, self.done_file)
         self.output_dir = output_dir
         self.failed_file = failed_file
         self.timeout = timeout
         self.retry = retry
         self.max_workers = max_workers
         self.cookie_str = cookie_str
-        self.lock = threading.Lock()
-        self.user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15",
-            "Mozilla/5.0 (Windows NT 10.0; WOW64; rv:91.0) Gecko/20100101 Firefox/91.0",
-        ]
+        # 所有线程共享一个HTTP/2客户端：并发GET在同一条TLS隧道上多路复用，
+        # 12路并发也只需少量连接，握手开销接近于零
+        self.session = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+            headers=dict(self._BASE_HEADERS),
+            cookies={"at-main": self.cookie_str},
+            timeout=self.timeout)
+        # 进度计数器，next()在GIL下原子，打印进度无需加锁
+        self._progress = itertools.count(1)
+        self._total = 0
+        # 重试堆：失败的ID带唤醒时间排队，由调度线程到点放回工作队列，
+        # 工作线程永远不原地睡眠
+        self._retry_heap = []
+        self._retry_lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._all_done = threading.Event()
+        self._work_q = None
+        # 完成日志只打开一次，成功的ID以追加方式记录
+        self._done_fp = open(self._done_path, "a", buffering=1 << 16, encoding="utf-8")
+        # 单独的写线程消费完成队列，工作线程入队即返回，互相不阻塞
+        self._done_q = queue.Queue()
+        self._writer = threading.Thread(target=self._drain_done, daemon=True)
+        self._writer.start()
 
     def read_ids(self):
-        path = os.path.join(self.root_dir, self.imdb_file)
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                ids = [line.strip() for line in f if line.strip().startswith("tt")]
-            print(f"📖 成功读取 {len(ids)} 个 IMDb ID")
+            with open(self._data_path, "rb") as f:
+                data = f.read()
+            # 整文件一次读入，正则在C层解析，去重同时保持顺序
+            ids = list(dict.fromkeys(m.group(0).decode("ascii") for m in _ID_RE.finditer(data)))
+            log.info(f"📖 成功读取 {len(ids)} 个 IMDb ID")
             return ids
         except Exception as e:
-            print(f"❌ 读取 IMDb ID 失败: {e}")
+            log.error(f"❌ 读取 IMDb ID 失败: {e}")
             return []
 
     def remove_id(self, imdb_id):
-        path = os.path.join(self.root_dir, self.imdb_file)
+        # 入队即返回，写盘由后台线程批量处理
+        self._done_q.put(imdb_id)
+        log.info(f"🗑️ 已记录完成 ID: {imdb_id}")
+
+    def _drain_done(self):
+        """
+        后台写线程：尽量多地取出已完成ID，合并成一次追加写入
+        """
+        while True:
+            imdb_id = self._done_q.get()
+            if imdb_id is None:
+                return
+            batch = [imdb_id]
+            while True:
+                try:
+                    nxt = self._done_q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._done_fp.write("".join(i + "\n" for i in batch))
+                    return
+                batch.append(nxt)
+            self._done_fp.write("".join(i + "\n" for i in batch))
+
+    def finalize_id_file(self):
+        """
+        程序结束时根据完成日志一次性重写ID文件
+        """
         try:
-            # 加锁，确保同一时刻只有一个线程修改文件
-            with self.lock:
-                with open(path, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                new_lines = [line for line in lines if line.strip() != imdb_id]
-                with open(path, "w", encoding="utf-8") as f:
-                    f.writelines(new_lines)
-            print(f"🗑️ 已移除已完成 ID: {imdb_id}")
+            self._done_fp.flush()
+            with open(self._done_path, "r", encoding="utf-8") as f:
+                done = {line.strip() for line in f if line.strip()}
+            with open(self._data_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            # 先写临时文件再原子替换，中途崩溃不会留下半截ID文件
+            with open(self._data_path + ".tmp", "w", encoding="utf-8") as f:
+                f.write("".join(line for line in lines if line.strip() not in done))
+            os.replace(self._data_path + ".tmp", self._data_path)
+            log.info(f"🧹 ID 文件已重写，共剔除 {len(done)} 个已完成 ID")
         except Exception as e:
-            print(f"❌ 移除 ID 失败: {imdb_id}, 原因: {e}")
-
-    def save_html(self, html, imdb_id):
-        os.makedirs(self.output_dir, exist_ok=True)
-        path = os.path.join(self.output_dir, f"{imdb_id}.html")
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(html)
-        print(f"✅ [{imdb_id}] HTML 保存成功")
+            log.error(f"❌ 重写 ID 文件失败: {e}")
 
     def is_challenge_page(self, html):
-        lower = html.lower()
-        return "awswaf" in lower or "challenge-container" in lower or "captcha" in lower
+        return bool(_CHALLENGE_RE.search(html))
 
-    def fetch_page(self, imdb_id):
-        session = requests.Session()
-        session.cookies.set("at-main", self.cookie_str, domain=".imdb.com")
+    def fetch_and_save(self, imdb_id, attempt=1):
+        """
+        流式抓取并落盘单个IMDB页面（单次尝试）：先用首个64KB块做挑战页判断，
+        干净时把后续数据块直接写入文件，整页不再在内存中驻留两份
+        """
         url = f"https://www.imdb.com/title/{imdb_id}/plotsummary/"
-        for attempt in range(1, self.retry + 1):
-            try:
-                headers = {
-                    "User-Agent": random.choice(self.user_agents),
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Referer": "https://www.imdb.com/",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                }
-                print(f"🌐 请求 {imdb_id} 第{attempt}次")
-                res = session.get(url, headers=headers, timeout=self.timeout)
+        path = os.path.join(self.output_dir, imdb_id + ".html")
+        try:
+            # Session是共享的，UA按请求传入避免跨线程改写headers
+            headers = {"User-Agent": random.choice(self._USER_AGENTS)}
+            log.info(f"🌐 请求 {imdb_id} 第{attempt}次")
+            with self.session.stream("GET", url, headers=headers) as res:
                 if res.status_code != 200:
                     raise Exception(f"HTTP状态码异常: {res.status_code}")
-                if self.is_challenge_page(res.text):
+                # WAF挑战响应自带特征头且远小于正常页面，先看头再看首块，
+                # 命中时直接断开，不再拉取剩余body
+                if "x-amzn-waf-action" in res.headers:
+                    raise Exception("响应头携带WAF挑战标记")
+                chunks = res.iter_bytes(1 << 16)
+                first = next(chunks, b"")
+                if self.is_challenge_page(first):
                     raise Exception("页面疑似反爬挑战")
-                return res.text
-            except Exception as e:
-                print(f"⚠️ 第{attempt}次请求失败: {e}")
-                time.sleep(3 + attempt * 2 + random.uniform(0.5, 2.5))
-        return None
+                # 先写临时文件，下载完整后原子改名，不留半截HTML
+                with open(path + ".tmp", "wb") as f:
+                    f.write(first)
+                    for chunk in chunks:
+                        f.write(chunk)
+                os.replace(path + ".tmp", path)
+            log.info(f"✅ [{imdb_id}] HTML 保存成功")
+            return True
+        except Exception as e:
+            log.warning(f"⚠️ 第{attempt}次请求失败: {e}")
+            return False
 
-    def worker(self, imdb_id):
-        try:
-            html = self.fetch_page(imdb_id)
-            if html:
-                try:
-                    self.save_html(html, imdb_id)
-                    self.remove_id(imdb_id)
-                    return None
-                except Exception as se:
-                    print(f"❌ [{imdb_id}] 保存失败: {se}")
-                    return imdb_id
+    def schedule_retry(self, imdb_id, attempt):
+        """
+        失败的ID带唤醒时间进入重试堆，线程槽位立即让给下一个ID
+        """
+        backoff = 3 + attempt * 2 + random.uniform(0.5, 2.5)
+        with self._retry_lock:
+            heapq.heappush(self._retry_heap, (time.monotonic() + backoff, attempt + 1, imdb_id))
+
+    def _retry_scheduler(self):
+        """
+        调度线程：到点的重试项重新放回工作队列
+        """
+        while not self._all_done.is_set():
+            now = time.monotonic()
+            while True:
+                with self._retry_lock:
+                    if not self._retry_heap or self._retry_heap[0][0] > now:
+                        break
+                    _, attempt, imdb_id = heapq.heappop(self._retry_heap)
+                self._work_q.put((imdb_id, attempt))
+            time.sleep(0.2)
+
+    def _task_done(self):
+        with self._pending_lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._all_done.set()
+
+    def worker_loop(self, work_q, failed):
+        """
+        工作线程主循环，不断从队列领取(ID, 尝试次数)，收到结束哨兵后退出
+        """
+        while True:
+            item = work_q.get()
+            if item is None:
+                return
+            imdb_id, attempt = item
+            if attempt == 1:
+                log.info(f"📥 处理进度: {next(self._progress)}/{self._total} - {imdb_id}")
+            try:
+                ok = self.fetch_and_save(imdb_id, attempt)
+            except Exception as e:
+                log.error(f"❌ [{imdb_id}] 爬取异常: {e}")
+                ok = False
+            if ok:
+                self.remove_id(imdb_id)
+                self._task_done()
+            elif attempt < self.retry:
+                self.schedule_retry(imdb_id, attempt)
             else:
-                return imdb_id
-        except Exception as e:
-            print(f"❌ [{imdb_id}] 爬取异常: {e}")
-            return imdb_id
+                failed.append(imdb_id)
+                self._task_done()
 
     def run(self):
-        print("=" * 60)
-        print("🚀 IMDb 多线程爬虫启动")
-        print("=" * 60)
+        log.info("=" * 60)
+        log.info("🚀 IMDb 多线程爬虫启动")
+        log.info("=" * 60)
         ids = self.read_ids()
         if not ids:
-            print("⚠️ 无可用 ID，退出")
+            log.warning("⚠️ 无可用 ID，退出")
             return
+        # 输出目录只创建一次，省掉每次保存的stat系统调用
+        os.makedirs(self.output_dir, exist_ok=True)
         start = time.time()
         failed = []
+        self._total = len(ids)
 
+        # 有界队列喂给固定数量的工作线程，避免一次性创建上万个future
+        self._work_q = queue.Queue(maxsize=2 * self.max_workers)
+        self._pending = len(ids)
+        self._all_done.clear()
+        scheduler = threading.Thread(target=self._retry_scheduler, daemon=True)
+        scheduler.start()
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(self.worker, imdb_id) for imdb_id in ids]
-            for future in concurrent.futures.as_completed(futures):
-                result = future.result()
-                if result:
-                    failed.append(result)
+            consumers = [executor.submit(self.worker_loop, self._work_q, failed)
+                         for _ in range(self.max_workers)]
+            for imdb_id in ids:
+                self._work_q.put((imdb_id, 1))
+            # 等所有ID（含重试）都有最终结果后再发结束哨兵
+            self._all_done.wait()
+            for _ in range(self.max_workers):
+                self._work_q.put(None)
+            for consumer in consumers:
+                consumer.result()
+        scheduler.join()
+
+        # 结束写线程并等待剩余ID落盘，再一次性回写ID文件
+        self._done_q.put(None)
+        self._writer.join()
+        self.finalize_id_file()
 
-        print("\n📊 总计: ", len(ids))
-        print("✅ 成功: ", len(ids) - len(failed))
-        print("❌ 失败: ", len(failed))
-        print(f"⏱️ 耗时: {int(time.time() - start)} 秒")
+        log.info(f"\n📊 总计: {len(ids)}")
+        log.info(f"✅ 成功: {len(ids) - len(failed)}")
+        log.info(f"❌ 失败: {len(failed)}")
+        log.info(f"⏱️ 耗时: {int(time.time() - start)} 秒")
 
         if failed:
             with open(self.failed_file, "w", encoding="utf-8") as f:
                 f.write("\n".join(failed))
-            print(f"📁 失败 ID 已保存到: {self.failed_file}")
+            log.info(f"📁 失败 ID 已保存到: {self.failed_file}")
 
+        # 退出前把内存缓冲里剩余的进度行全部刷出
+        _memory_handler.flush()
         input("\n🎉 所有任务完成！按 Enter 退出...")
 
 
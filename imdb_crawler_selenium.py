@@ -10,11 +10,36 @@
 """
 
 from selenium import webdriver
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import (WebDriverException, TimeoutException,
+                                        InvalidSessionIdException, NoSuchWindowException)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import re
+import mmap
+import base64
 import time
 import os
+import queue
 import random
+import asyncio
+import aiohttp
+import threading
 import traceback
+import concurrent.futures
+
+# 有效页面与拒绝页面的特征，预编译成单次扫描的正则，免去lower()整页拷贝
+_VALID_RE = re.compile(r"imdb|summary|plot|synopsis", re.IGNORECASE)
+_BAD_RE = re.compile(r"captcha|access denied", re.IGNORECASE)
+
+# 剧情页固定携带的标记，单次find判定有效性
+_PLOT_MARKER = 'data-testid="sub-section-summaries"'
+
+# ID行特征，一次读入后由正则引擎在C层整体解析
+_ID_RE = re.compile(rb"^tt\d{7,}", re.M)
+
+# save_imdb_html的特殊返回值：浏览器会话已失效，需要重建driver
+_DRIVER_DEAD = object()
 
 
 class IMDBCrawler:
@@ -23,12 +48,14 @@ class IMDBCrawler:
         self.IMDB_ID_FILE = "data.txt"
         self.OUTPUT_DIR = "imdb_plots"
         self.FAILED_FILE = "failed_ids.txt"
+        self.DONE_FILE = "done.txt"
 
         # 配置选项
         self.headless = False                   # 是否使用无头模式
         self.timeout = 30                       # 页面加载超时时间（秒）
         self.retries = 2                        # 重试次数
-        self.delay_range = (8.0, 15.0)          # 请求之间的随机延迟范围（秒）
+        self.delay_range = (1.0, 3.0)           # 请求之间的随机延迟范围（秒）
+        self.num_workers = 4                    # 并行浏览器实例数
 
         # 浏览器参数
         self.browser_args = [
@@ -42,26 +69,31 @@ class IMDBCrawler:
         self.user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36 Edg/122.0.0.0"
 
         # 状态变量
-        self.driver = None
         self.original_dir = self.ROOT_DIR
 
+        # 路径只拼接一次，热路径直接取用
+        self._data_path = os.path.join(self.ROOT_DIR, self.IMDB_ID_FILE)
+        self._done_path = os.path.join(self.ROOT_DIR, self.DONE_FILE)
+        # 工作线程共享完成日志与data.txt，写入时串行化
+        self._file_lock = threading.Lock()
+        self._done_fp = None
+        self._write_q = None
+
     def read_imdb_ids_from_file(self, filename=None):
         """
         从文件中读取IMDB页面对应的ID列表
         :param filename:
         :return:
         """
-        filename = filename or self.IMDB_ID_FILE
-        filepath = os.path.join(self.ROOT_DIR, filename)
-        imdb_ids = []
+        filepath = self._data_path if filename is None else os.path.join(self.ROOT_DIR, filename)
 
         try:
             print(f"📖 尝试从文件 {filepath} 读取IMDb ID列表...")
-            with open(filepath, "r", encoding="utf-8") as file:
-                for line in file:
-                    line = line.strip()
-                    if line.startswith("tt") and len(line) >= 9:
-                        imdb_ids.append(line)
+            with open(filepath, "rb") as file:
+                data = file.read()
+            # 整文件一次读入，正则在C层解析，去重同时保持顺序
+            imdb_ids = list(dict.fromkeys(
+                m.group(0).decode("ascii") for m in _ID_RE.finditer(data)))
 
             if not imdb_ids:
                 raise ValueError("⚠️ 文件为空或未找到有效的IMDb ID")
@@ -76,28 +108,62 @@ class IMDBCrawler:
             traceback.print_exc()
             return []
 
+    def mark_done(self, imdb_id):
+        """
+        将已完成的ID追加写入完成日志（O(1)），data.txt的重写推迟到收尾阶段
+        :param imdb_id: IMDB页面对应的ID
+        :return: None
+        """
+        with self._file_lock:
+            self._done_fp.write(imdb_id + "\n")
+
+    def rewrite_id_file(self):
+        """
+        程序结束时根据完成日志一次性重写ID文件
+        :return: None
+        """
+        try:
+            with open(self._done_path, "r", encoding="utf-8") as f:
+                done = {line.strip() for line in f if line.strip()}
+            with open(self._data_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            # 先写临时文件再原子替换，中途崩溃不会留下半截ID文件
+            with open(self._data_path + ".tmp", "w", encoding="utf-8") as f:
+                f.write("".join(line for line in lines if line.strip() not in done))
+            os.replace(self._data_path + ".tmp", self._data_path)
+            print(f"🧹 ID文件已重写，共剔除 {len(done)} 个已完成ID")
+        except Exception as e:
+            print(f"❌ 重写ID文件失败: {str(e)}")
+
     def remove_id_from_file(self, imdb_id, filename=None):
         """
-        从文件中删除已成功处理的IMDB页面对应的ID
+        从文件中删除已成功处理的IMDB页面对应的ID（旧版工具方法，
+        热路径已改为mark_done追加完成日志）
         :param imdb_id: IMDB页面对应的ID
         :param filename: 目标文件
         :return: 删除结果
         """
-        filename = filename or self.IMDB_ID_FILE
-        filepath = os.path.join(self.ROOT_DIR, filename)
+        filepath = self._data_path if filename is None else os.path.join(self.ROOT_DIR, filename)
 
         try:
             print(f"🗑️ 正在从 {filepath} 中移除ID: {imdb_id}")
-            # 读取所有行
-            with open(filepath, "r", encoding="utf-8") as file:
-                lines = file.readlines()
-
-            # 移除包含该ID的行
-            new_lines = [line for line in lines if line.strip() != imdb_id]
-
-            # 写回文件
-            with open(filepath, "w", encoding="utf-8") as file:
-                file.writelines(new_lines)
+            # mmap文件后用一次C级memmove把尾部前移，再截断文件，
+            # 不再把上万行解码成str逐行重写
+            needle = (imdb_id + "\n").encode("utf-8")
+            with self._file_lock, open(filepath, "r+b") as file:
+                with mmap.mmap(file.fileno(), 0) as mm:
+                    i = mm.find(needle)
+                    if i >= 0:
+                        mm.move(i, i + len(needle), len(mm) - i - len(needle))
+                        mm.flush()
+                        new_size = len(mm) - len(needle)
+                    elif len(mm) >= len(needle) - 1 and mm[-(len(needle) - 1):] == needle[:-1]:
+                        # 末行可能没有换行符，直接截掉文件尾部
+                        new_size = len(mm) - (len(needle) - 1)
+                    else:
+                        print(f"⚠️ 文件 {filepath} 中未找到ID: {imdb_id}")
+                        return False
+                file.truncate(new_size)
 
             print(f"✅ 已从 {filepath} 中成功移除ID: {imdb_id}")
             return True
@@ -106,11 +172,12 @@ class IMDBCrawler:
             traceback.print_exc()
             return False
 
-    def is_content_valid(self, html, imdb_id):
+    def is_content_valid(self, html, imdb_id, strict=True):
         """
         验证获取的HTML内容是否有效
         :param html: 目标HTML页面
         :param imdb_id: IMDB页面对应的ID
+        :param strict: 严格模式只找固定标记；IMDb改版标记缺失时可传False退回关键词检查
         :return: 判断结果
         """
         # 基础长度检查
@@ -118,26 +185,31 @@ class IMDBCrawler:
             print(f"⚠️ 内容过短: {len(html)} 字节")
             return False
 
-        # 关键词检查
-        keywords = ["imdb", imdb_id, "summary", "plot", "synopsis"]
-        found = any(kw in html.lower() for kw in keywords)
-
-        # 负向检查
-        if "captcha" in html.lower() or "access denied" in html.lower():
+        # 验证码提示只会出现在文档开头，只扫前8KB
+        if html.find("captcha", 0, 8192) >= 0:
             print("⚠️ 检测到验证码或访问拒绝")
             return False
 
-        # 允许部分缺失关键词
+        # 剧情页固定携带此标记，单次find即可判定，命中立即返回
+        if html.find(_PLOT_MARKER) >= 0:
+            return True
+        if strict:
+            print("⚠️ 未找到剧情简介标记")
+            return False
+
+        # 宽松模式：标记缺失时退回到原有的负向+关键词扫描，只看前200KB
+        if _BAD_RE.search(html, 0, 200_000):
+            print("⚠️ 检测到验证码或访问拒绝")
+            return False
+        found = bool(_VALID_RE.search(html, 0, 200_000)) or html.find(imdb_id, 0, 200_000) >= 0
         if not found:
             print("⚠️ 未找到所有关键词，但长度足够")
-            return True  # 仅发出警告但允许保存
-
         return True
 
     def create_driver(self):
         """
         创建WebDriver实例
-        :return: 创建结果
+        :return: driver实例，失败返回None
         """
         print("🔧 正在启动浏览器实例...")
 
@@ -154,62 +226,60 @@ class IMDBCrawler:
             # 设置用户代理
             options.add_argument(f"user-agent={self.user_agent}")
 
+            # eager策略在DOM就绪后立即返回，不等图片广告等子资源；
+            # 配合prefs直接禁掉图片/样式/字体的加载
+            options.page_load_strategy = "eager"
+            options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.managed_default_content_settings.stylesheets": 2,
+                "profile.managed_default_content_settings.fonts": 2,
+            })
+
             # 创建driver
-            self.driver = webdriver.Edge(options=options)
+            driver = webdriver.Edge(options=options)
+
+            # 静态资源与广告域名在浏览器进程内直接拦截
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": [
+                "*.png", "*.jpg", "*.jpeg", "*.gif", "*.woff*", "*.css", "*.mp4",
+                "*googletagmanager*", "*doubleclick*"]})
+            driver.execute_cdp_cmd("Network.enable", {})
 
-            # 设置超时
-            self.driver.set_page_load_timeout(self.timeout)
-            self.driver.implicitly_wait(5)
+            # 超时只在创建时设置一次；隐式等待归零，
+            # 否则每次find_element（含健康检查）最多白等5秒
+            driver.set_page_load_timeout(self.timeout)
+            driver.implicitly_wait(0)
 
             print("✅ 浏览器实例已成功创建")
-            return True
+            return driver
         except WebDriverException as e:
             print(f"❌ 创建浏览器实例失败: {str(e)}")
             print("请确保已正确安装Microsoft Edge WebDriver")
             print(f"下载地址: https://developer.microsoft.com/en-us/microsoft-edge/tools/webdriver/")
-            return False
+            return None
 
-    def init_browser(self):
+    def _get_page_html(self, driver, url):
         """
-        初始化浏览器环境
-        :return: 初始化结果
+        通过CDP直接读取页面原始HTML，跳过page_source的DOM序列化和JSON编解码
+        :param driver: 执行抓取的driver实例
+        :param url: 页面URL
+        :return: HTML字符串
         """
-        if not self.create_driver():
-            return False
-
-        print("🔧 正在切换到输出目录...")
-        # 创建输出目录
-        os.makedirs(self.OUTPUT_DIR, exist_ok=True)
-        output_path = os.path.join(self.ROOT_DIR, self.OUTPUT_DIR)
-        print(f"📂 输出目录: {output_path}")
-
-        # 记录原始目录
-        self.original_dir = os.getcwd()
-        os.chdir(output_path)
-
-        return True
-
-    def restart_browser(self):
-        """
-        重启浏览器实例
-        :return: 重启结果
-        """
-        print("🔄 正在重启浏览器实例...")
         try:
-            # 先尝试关闭现有浏览器
-            if self.driver:
-                self.driver.quit()
-                print("✅ 浏览器已关闭")
-
-            # 重新创建浏览器
-            return self.create_driver()
-        except Exception as e:
-            print(f"❌ 重启浏览器失败: {str(e)}")
-            return False
-
-    def save_imdb_html(self, imdb_id):
+            tree = driver.execute_cdp_cmd("Page.getResourceTree", {})
+            frame_id = tree["frameTree"]["frame"]["id"]
+            res = driver.execute_cdp_cmd(
+                "Page.getResourceContent", {"frameId": frame_id, "url": url})
+            if res["base64Encoded"]:
+                return base64.b64decode(res["content"]).decode("utf-8", errors="replace")
+            return res["content"]
+        except (WebDriverException, KeyError):
+            # 资源已被逐出缓存或内核不支持CDP时，退回DOM序列化
+            return driver.page_source
+
+    def save_imdb_html(self, driver, imdb_id):
         """
         保存IMDB页面
+        :param driver: 执行抓取的driver实例
         :param imdb_id: IMDB页面对应的ID
         :return: 保存结果
         """
@@ -227,49 +297,43 @@ class IMDBCrawler:
             try:
                 print(f"📡 尝试 #{attempt + 1}/{self.retries + 1}: {url}")
 
-                # 设置超时
-                self.driver.set_page_load_timeout(self.timeout)
+                # 访问URL（超时已在create_driver中设置）
+                driver.get(url)
 
-                # 访问URL
-                self.driver.get(url)
-
-                # 随机等待时间
-                wait_time = random.uniform(3.0, 8.0)  # 3-8秒
-                print(f"⏳ 等待 {wait_time:.1f} 秒让页面完全加载...")
-                time.sleep(wait_time)
+                # 显式等待剧情简介节点出现，内容就绪后立即返回
+                try:
+                    WebDriverWait(driver, self.timeout).until(
+                        EC.presence_of_element_located(
+                            (By.CSS_SELECTOR, '[data-testid="sub-section-summaries"], #summaries')))
+                except TimeoutException:
+                    print("⏳ 等待剧情简介节点超时，继续尝试验证现有内容...")
 
                 # 获取页面源码
-                html = self.driver.page_source
+                html = self._get_page_html(driver, url)
 
                 # 验证内容
                 if self.is_content_valid(html, imdb_id):
-                    # 保存HTML文件
-                    with open(filename, "w", encoding="utf-8") as f:
-                        f.write(html)
-                    print(f"✅ HTML内容已保存: {filename}")
-
-                    # 从源文件中移除ID
-                    if self.remove_id_from_file(imdb_id):
-                        print(f"✅ ID {imdb_id} 已从源文件中移除")
-                    else:
-                        print(f"⚠️ 警告: ID {imdb_id} 已成功处理但未能从源文件中移除")
+                    # 编码后交给后台写线程落盘，本线程立即开始下一次导航
+                    self._write_q.put((filename, html.encode("utf-8")))
+                    print(f"✅ HTML内容已提交保存: {filename}")
+
+                    # 记入完成日志，data.txt的重写推迟到收尾阶段一次完成
+                    self.mark_done(imdb_id)
                     return True
                 else:
                     print("🔄 内容验证失败，刷新页面...")
-                    self.driver.refresh()
-                    time.sleep(3)
+                    driver.refresh()
+                    # 刷新后的就绪判断交给下一轮的显式等待，这里只留极短间隔
+                    time.sleep(0.5)
+            except (InvalidSessionIdException, NoSuchWindowException) as e:
+                # 会话确已死亡，直接交给工作线程重建driver，
+                # 不再用current_url做每个ID一次的预防性健康检查
+                print(f"❌ 浏览器会话失效: {type(e).__name__}")
+                return _DRIVER_DEAD
             except Exception as e:
                 print(f"❌ 尝试 #{attempt + 1} 失败: {str(e)}")
                 print(f"异常类型: {type(e).__name__}")
 
-                # 检查浏览器会话是否有效
-                try:
-                    self.driver.current_url
-                except:
-                    print("⚠️ 浏览器会话异常")
-                    if not self.restart_browser():
-                        return False
-
                 # 等待后重试
                 if attempt < self.retries:
                     wait_time = random.uniform(2.0, 5.0)
@@ -279,6 +343,66 @@ class IMDBCrawler:
         print(f"❌ [{imdb_id}] 最终处理失败")
         return False
 
+    @staticmethod
+    def _write_html_file(path, data):
+        """
+        一次性编码好的bytes无缓冲写入，整页一两个write系统调用落盘
+        :param path: 目标文件路径
+        :param data: 页面字节串
+        :return: None
+        """
+        with open(path, "wb", buffering=0) as f:
+            f.write(data)
+
+    async def fetch_imdb_html(self, session, semaphore, imdb_id):
+        """
+        HTTP快速通道：直接GET剧情页并随手落盘，内容可疑时交给Selenium兜底。
+        页面在本协程内写完即释放，内存只保留在途的几个页面
+        :param session: 共享的aiohttp会话
+        :param semaphore: 并发闸门
+        :param imdb_id: IMDB页面对应的ID
+        :return: 成功返回None，需要浏览器兜底时返回该ID
+        """
+        url = f"https://www.imdb.com/title/{imdb_id}/plotsummary/"
+        async with semaphore:
+            try:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=20)) as res:
+                    if res.status != 200:
+                        return imdb_id
+                    html = await res.text()
+            except Exception as e:
+                print(f"⚠️ [{imdb_id}] HTTP快速通道异常: {e}")
+                return imdb_id
+        try:
+            if not self.is_content_valid(html, imdb_id):
+                return imdb_id
+            path = os.path.join(self.ROOT_DIR, self.OUTPUT_DIR, f"{imdb_id}.html")
+            # 磁盘写交给线程，避免阻塞事件循环
+            await asyncio.to_thread(self._write_html_file, path, html.encode("utf-8"))
+            print(f"✅ [{imdb_id}] HTTP快速通道已保存")
+            self.mark_done(imdb_id)
+            return None
+        except Exception as e:
+            print(f"⚠️ [{imdb_id}] HTTP快速通道保存失败: {e}")
+            return imdb_id
+
+    async def batch_fetch_async(self, imdb_ids):
+        """
+        用同一个keep-alive连接池批量抓取所有ID，免去浏览器进程开销
+        :param imdb_ids: IMDB页面对应的ID列表
+        :return: (成功数量, 需要Selenium兜底的ID列表)
+        """
+        connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=60)
+        async with aiohttp.ClientSession(connector=connector,
+                                         headers={"User-Agent": self.user_agent}) as session:
+            semaphore = asyncio.Semaphore(8)
+            results = await asyncio.gather(
+                *[self.fetch_imdb_html(session, semaphore, imdb_id) for imdb_id in imdb_ids],
+                return_exceptions=False)
+
+        remaining = [r for r in results if r]
+        return len(imdb_ids) - len(remaining), remaining
+
     def batch_process(self, imdb_ids):
         """
         批量处理IMDB页面对应的ID
@@ -292,59 +416,136 @@ class IMDBCrawler:
         print(f"🚀 IMDb批量处理开始，共 {len(imdb_ids)} 个ID")
         print("=" * 60)
 
-        # 初始化浏览器环境
-        if not self.init_browser():
-            print("❌ 无法初始化浏览器环境，程序终止")
-            return 0, [], False
+        # 完成日志只打开一次，成功的ID以追加方式记录
+        self._done_fp = open(self._done_path, "a", buffering=1 << 16, encoding="utf-8")
+
+        # 先走HTTP快速通道，只有疑似验证码或抓取失败的ID才动用浏览器
+        os.makedirs(os.path.join(self.ROOT_DIR, self.OUTPUT_DIR), exist_ok=True)
+        http_success, imdb_ids = asyncio.run(self.batch_fetch_async(imdb_ids))
+        print(f"⚡ HTTP快速通道成功 {http_success} 个，剩余 {len(imdb_ids)} 个转Selenium兜底")
+
+        if not imdb_ids:
+            self._done_fp.close()
+            self.rewrite_id_file()
+            return http_success, [], True
+
+        # 切换到输出目录，HTML文件直接按文件名落盘
+        output_path = os.path.join(self.ROOT_DIR, self.OUTPUT_DIR)
+        print(f"📂 输出目录: {output_path}")
+        self.original_dir = os.getcwd()
+        os.chdir(output_path)
 
-        success_count = 0
         failed_ids = []
         result = False
+        selenium_total = len(imdb_ids)
 
-        try:
-            for i, imdb_id in enumerate(imdb_ids):
-                print(f"\n📥 处理进度: [{i + 1}/{len(imdb_ids)}] - ID: {imdb_id}")
-
-                # 检查浏览器状态
-                try:
-                    self.driver.current_url  # 健康检查
-                except:
-                    print("⚠️ 浏览器会话异常，尝试重启...")
-                    if not self.restart_browser():
-                        print("❌ 无法重启浏览器，终止剩余任务")
-                        break
-
-                # 处理当前ID
-                if self.save_imdb_html(imdb_id):
-                    success_count += 1
-                else:
-                    failed_ids.append(imdb_id)
+        # 写盘与抓取流水线化：完成的HTML交给后台写线程
+        self._write_q = queue.Queue(maxsize=16)
+        writer_thr = threading.Thread(target=self._html_writer_loop, daemon=True)
+        writer_thr.start()
 
-                # 请求之间的延迟
-                if i < len(imdb_ids) - 1:
-                    delay = random.uniform(*self.delay_range)
-                    print(f"⏳ 等待 {delay:.1f} 秒后继续处理下一个...")
-                    time.sleep(delay)
+        # 每个工作线程独享一个浏览器实例，从共享队列领取ID，
+        # 网络等待在多个实例之间重叠
+        work_q = queue.Queue()
+        for imdb_id in imdb_ids:
+            work_q.put(imdb_id)
+        workers = min(self.num_workers, selenium_total)
+        print(f"🧵 启动 {workers} 个浏览器工作线程...")
 
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self._selenium_worker, work_q, failed_ids)
+                           for _ in range(workers)]
+                for future in futures:
+                    future.result()
             result = True
         except Exception as e:
             print(f"❌ 批量处理严重错误: {str(e)}")
             traceback.print_exc()
         finally:
-            # 关闭浏览器
-            if self.driver:
-                try:
-                    self.driver.quit()
-                    print("✅ 浏览器已关闭")
-                except Exception as e:
-                    print(f"❌ 关闭浏览器时出错: {str(e)}")
+            # 发哨兵并等待写线程把剩余HTML落盘
+            self._write_q.put(None)
+            writer_thr.join()
 
             # 返回原始工作目录
             os.chdir(self.original_dir)
             print(f"✅ 已返回原始工作目录: {self.original_dir}")
 
+            # 关闭完成日志并据其一次性重写ID文件
+            self._done_fp.close()
+            self.rewrite_id_file()
+
+            success_count = http_success + selenium_total - len(failed_ids)
             return success_count, failed_ids, result
 
+    def _html_writer_loop(self):
+        """
+        后台写线程：从队列领取(文件名, 字节串)写盘，收到None哨兵后退出
+        :return: None
+        """
+        while True:
+            item = self._write_q.get()
+            if item is None:
+                return
+            filename, data = item
+            try:
+                # 一次性编码好的bytes无缓冲写入，整页一两个write系统调用落盘
+                with open(filename, "wb", buffering=0) as f:
+                    f.write(data)
+                print(f"💾 HTML内容已落盘: {filename}")
+            except Exception as e:
+                print(f"❌ 写入失败: {filename} - {str(e)}")
+
+    def _selenium_worker(self, work_q, failed_ids):
+        """
+        单个浏览器实例的工作线程：不断从队列领取ID处理，会话失效时重建driver
+        :param work_q: 待处理ID队列
+        :param failed_ids: 失败ID列表（共享）
+        :return: None
+        """
+        driver = self.create_driver()
+        try:
+            while True:
+                try:
+                    imdb_id = work_q.get_nowait()
+                except queue.Empty:
+                    return
+
+                if driver is None:
+                    failed_ids.append(imdb_id)
+                    continue
+
+                try:
+                    ok = self.save_imdb_html(driver, imdb_id)
+                except Exception as e:
+                    print(f"🔥 [{imdb_id}] 工作线程异常: {e}")
+                    ok = False
+
+                # 仅在会话确实死亡时才重建driver，省掉逐ID的健康检查往返；
+                # 该ID并未真正抓取，放回队列等待重试而不是记为失败
+                if ok is _DRIVER_DEAD:
+                    work_q.put(imdb_id)
+                    print("⚠️ 浏览器会话失效，正在重建...")
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                    driver = self.create_driver()
+                    continue
+                if not ok:
+                    failed_ids.append(imdb_id)
+
+                # 请求之间的延迟
+                delay = random.uniform(*self.delay_range)
+                time.sleep(delay)
+        finally:
+            if driver is not None:
+                try:
+                    driver.quit()
+                    print("✅ 浏览器已关闭")
+                except Exception as e:
+                    print(f"❌ 关闭浏览器时出错: {str(e)}")
+
     def run(self):
         """
         运行爬虫主程序
@@ -10,16 +10,67 @@
 """
 
 import os
+import sys
 import glob
 import zstandard as zstd
 import tarfile
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import time
+import random
 import argparse
 from tqdm import tqdm
 import shutil
 import math
 
+# libarchive在C层构建tar头，十万级小文件归档时省去解释器逐头构造的开销；
+# 不可用时回退到标准库tarfile
+try:
+    import libarchive as _libarchive
+except ImportError:
+    _libarchive = None
+
+
+def _compress_shard(files, out_path, level, root_dir, dict_bytes):
+    """
+    压缩单个文件分片为独立的tar.zst帧（在子进程中执行，需为模块级函数）
+    :param files: 本分片的文件列表
+    :param out_path: 分片输出路径
+    :param level: Zstd压缩级别
+    :param root_dir: 归档内相对路径的根目录
+    :param dict_bytes: 预训练字典字节串，无字典时为None
+    :return: 本分片处理的文件数
+    """
+    dict_data = zstd.ZstdCompressionDict(dict_bytes) if dict_bytes else None
+    cctx = zstd.ZstdCompressor(level=level, dict_data=dict_data)
+    with open(out_path, 'wb', buffering=1 << 20) as f_out:
+        with cctx.stream_writer(f_out, write_size=1 << 20) as compressor:
+            if _libarchive is not None:
+                # zstd的write返回的是压缩后字节数，libarchive会当成短写，
+                # 这里包一层固定返回传入长度
+                def _write(data, _c=compressor):
+                    _c.write(data)
+                    return len(data)
+
+                with _libarchive.custom_writer(_write, "ustar") as archive:
+                    for file_path in files:
+                        arcname = os.path.relpath(file_path, root_dir)
+                        with open(file_path, 'rb', buffering=1 << 20) as fsrc:
+                            archive.add_file_from_memory(
+                                arcname, os.path.getsize(file_path), fsrc.read())
+            else:
+                with tarfile.open(fileobj=compressor, mode='w|') as tar:
+                    for file_path in files:
+                        # 自建TarInfo只stat一次，源文件用大缓冲读
+                        arcname = os.path.relpath(file_path, root_dir)
+                        st = os.stat(file_path)
+                        ti = tarfile.TarInfo(name=arcname)
+                        ti.size = st.st_size
+                        ti.mtime = int(st.st_mtime)
+                        ti.mode = 0o644
+                        with open(file_path, 'rb', buffering=1 << 20) as fsrc:
+                            tar.addfile(ti, fsrc)
+    return len(files)
+
 
 class IMDbDataCleaner:
     def __init__(self, data_file="data.txt", html_dir=r"D:\imdb_plots"):
@@ -27,15 +78,19 @@ class IMDbDataCleaner:
         self.html_dir = html_dir
 
     def load_html_ids(self):
-        html_ids = set()
         if not os.path.exists(self.html_dir):
             print(f"❌ HTML目录不存在: {self.html_dir}")
-            return html_ids
+            return set()
 
-        for fname in os.listdir(self.html_dir):
-            if fname.lower().endswith(".html") and fname.startswith("tt"):
-                html_id = os.path.splitext(fname)[0]
-                html_ids.add(html_id)
+        if sys.platform == "win32":
+            # Windows下iglob把tt*.html模式下推到FindFirstFile，内核层完成过滤
+            html_ids = {os.path.basename(p)[:-5]
+                        for p in glob.iglob(os.path.join(self.html_dir, "tt*.html"))}
+        else:
+            # 其余平台scandir不触发额外stat，集合推导一次建完
+            with os.scandir(self.html_dir) as it:
+                html_ids = {entry.name[:-5] for entry in it
+                            if entry.name.endswith(".html") and entry.name.startswith("tt")}
         print(f"📁 从HTML目录中提取到 {len(html_ids)} 个ID")
         return html_ids
 
@@ -44,8 +99,9 @@ class IMDbDataCleaner:
             print(f"❌ data.txt 文件不存在: {self.data_file}")
             return
 
+        # 整文件一次读入后split，免去逐行的Python循环
         with open(self.data_file, "r", encoding="utf-8") as f:
-            original_ids = [line.strip() for line in f if line.strip()]
+            original_ids = f.read().split()
         print(f"📄 原始data.txt中共有 {len(original_ids)} 个ID")
 
         html_ids = self.load_html_ids()
@@ -74,8 +130,9 @@ class IMDbDataSplitter:
             print(f"❌ data.txt 文件不存在: {self.data_file}")
             return
 
-        with open(self.data_file, "r", encoding="utf-8") as f:
-            ids = [line.strip() for line in f if line.strip()]
+        # 一次读入bytes后C层split，免去逐行解码
+        with open(self.data_file, "rb") as f:
+            ids = f.read().split()
 
         total = len(ids)
         if total == 0:
@@ -89,10 +146,11 @@ class IMDbDataSplitter:
         part1_path = os.path.join(self.output_dir, "data_part1.txt")
         part2_path = os.path.join(self.output_dir, "data_part2.txt")
 
-        with open(part1_path, "w", encoding="utf-8") as f1:
-            f1.write("\n".join(part1) + "\n")
-        with open(part2_path, "w", encoding="utf-8") as f2:
-            f2.write("\n".join(part2) + "\n")
+        # 逐条写入大缓冲，不在内存里拼接整个大字符串
+        with open(part1_path, "wb", buffering=1 << 20) as f1:
+            f1.writelines(i + b"\n" for i in part1)
+        with open(part2_path, "wb", buffering=1 << 20) as f2:
+            f2.writelines(i + b"\n" for i in part2)
 
         print(f"✅ 分割完成，共 {total} 个ID：")
         print(f"    📄 写入 {len(part1)} 行到 {part1_path}")
@@ -108,7 +166,7 @@ class IMDbDataSplitter:
 
 class HTMLArchiveCompressor:
     def __init__(self, directory, output_file, compression_level=3, max_workers=None,
-                 keep_original=False, verbose=False):
+                 keep_original=False, verbose=False, dict_path=None):
         """
         初始化HTML归档压缩器
         :param directory: 包含HTML文件的目录路径
@@ -117,12 +175,14 @@ class HTMLArchiveCompressor:
         :param max_workers: 线程池大小(默认=CPU核心数×2)
         :param keep_original: 是否保留原始HTML文件(默认False)
         :param verbose: 是否显示详细输出(默认False)
+        :param dict_path: 预训练Zstd字典路径(默认None时自动训练并保存)
         """
         self.directory = directory
         self.output_file = output_file
         self.compression_level = compression_level
         self.keep_original = keep_original
         self.verbose = verbose
+        self.dict_path = dict_path
 
         # 自动确定合适的线程数
         self.max_workers = max_workers or (os.cpu_count() * 2 if os.cpu_count() else 8)
@@ -160,36 +220,43 @@ class HTMLArchiveCompressor:
             # 创建输出目录
             os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
 
-            # 使用Zstd压缩器
-            cctx = zstd.ZstdCompressor(level=self.compression_level, threads=0)
+            # 剧情页共享大量模板，字典压缩显著提高压缩比；
+            # 没有现成字典时从样本训练一个，保存在归档旁供解压端复用
+            dict_data = self._load_or_train_dict()
+            dict_bytes = dict_data.as_bytes() if dict_data else None
+
+            # 按CPU核心数分片，每个子进程独立构建tar流并压缩成完整的Zstd帧；
+            # 帧顺序拼接仍是合法的Zstd流（解压端以ignore_zeros跨过tar结尾块）
+            num_shards = min(os.cpu_count() or 1, self.total_files)
+            shards = [self.html_files[i::num_shards] for i in range(num_shards)]
+            shard_paths = [f"{self.output_file}.part{i}" for i in range(num_shards)]
 
             # 创建进度条
             progress_bar = tqdm(total=self.total_files, disable=not self.verbose,
                                 desc="Compressing files", unit="file")
 
-            # 打开输出文件
-            with open(self.output_file, 'wb') as f_out:
-                # 创建Zstd压缩流
-                with cctx.stream_writer(f_out) as compressor:
-                    # 创建tar归档器
-                    with tarfile.open(fileobj=compressor, mode='w|') as tar:
-                        # 添加所有HTML文件到tar归档
-                        for file_path in self.html_files:
-                            # 计算在归档中的相对路径
-                            arcname = os.path.relpath(file_path, self.directory)
-
-                            # 添加文件到tar
-                            tar.add(file_path, arcname=arcname)
+            with ProcessPoolExecutor(max_workers=num_shards) as executor:
+                futures = [executor.submit(_compress_shard, shard, path,
+                                           self.compression_level, self.directory, dict_bytes)
+                           for shard, path in zip(shards, shard_paths)]
+                for future in futures:
+                    done = future.result()
+                    self.processed_files += done
+                    progress_bar.update(done)
 
-                            # 更新进度
-                            self.processed_files += 1
-                            progress_bar.update(1)
+            progress_bar.close()
 
-                            # 删除原始文件
-                            if not self.keep_original:
-                                os.remove(file_path)
+            # 分片帧顺序拼接成最终归档
+            with open(self.output_file, 'wb', buffering=1 << 20) as f_out:
+                for path in shard_paths:
+                    with open(path, 'rb', buffering=1 << 20) as f_in:
+                        shutil.copyfileobj(f_in, f_out, length=1 << 20)
+                    os.remove(path)
 
-            progress_bar.close()
+            # 全部归档成功后再删除原始文件
+            if not self.keep_original:
+                for file_path in self.html_files:
+                    os.remove(file_path)
 
             # 显示最终结果
             elapsed_time = time.time() - self.start_time
@@ -203,18 +270,40 @@ class HTMLArchiveCompressor:
             print(f"Error during compression: {str(e)}")
             return False
 
+    def _load_or_train_dict(self):
+        """
+        加载或训练Zstd压缩字典
+        :return: 字典对象，训练失败时返回None（无字典压缩）
+        """
+        if self.dict_path:
+            with open(self.dict_path, 'rb') as f:
+                return zstd.ZstdCompressionDict(f.read())
+        try:
+            samples = [open(p, 'rb').read()
+                       for p in random.sample(self.html_files, min(1000, self.total_files))]
+            dict_data = zstd.train_dictionary(131072, samples)
+            with open(self.output_file + ".zdict", 'wb') as f:
+                f.write(dict_data.as_bytes())
+            print(f"Dictionary trained and saved to {self.output_file}.zdict")
+            return dict_data
+        except Exception as e:
+            print(f"Dictionary training skipped: {str(e)}")
+            return None
+
 
 class ZstdTarExtractor:
-    def __init__(self, archive_path, extract_dir, verbose=False):
+    def __init__(self, archive_path, extract_dir, verbose=False, dict_path=None):
         """
         初始化Zstd Tar解压器
         :param archive_path: .tar.zst压缩文件路径
         :param extract_dir: 解压目标目录
         :param verbose: 是否显示详细输出
+        :param dict_path: Zstd字典路径(默认在压缩文件旁查找.zdict)
         """
         self.archive_path = archive_path
         self.extract_dir = extract_dir
         self.verbose = verbose
+        self.dict_path = dict_path
 
         # 验证文件存在
         if not os.path.exists(archive_path):
@@ -234,31 +323,25 @@ class ZstdTarExtractor:
         total_size = os.path.getsize(self.archive_path)
 
         try:
-            # 使用Zstd解压器
-            dctx = zstd.ZstdDecompressor()
-
-            # 打开压缩文件
-            with open(self.archive_path, 'rb') as f_in:
-                # 创建解压流
-                with dctx.stream_reader(f_in) as decompressed:
-                    # 使用tarfile打开解压后的数据流
-                    with tarfile.open(fileobj=decompressed, mode='r|') as tar:
-                        # 创建进度条
-                        pbar = tqdm(desc="Extracting", total=total_size,
-                                    unit='B', unit_scale=True, disable=not self.verbose)
-
-                        # 提取所有文件
-                        for member in tar:
-                            # 显示当前提取的文件
-                            if self.verbose:
-                                print(f"Extracting: {member.name}")
-
-                            tar.extract(member, self.extract_dir)
-
-                            # 更新进度条
-                            pbar.update(f_in.tell() - pbar.n)
-
-                        pbar.close()
+            # 使用Zstd解压器，归档旁有字典时一并加载
+            dict_path = self.dict_path or (self.archive_path + ".zdict")
+            if os.path.exists(dict_path):
+                with open(dict_path, 'rb') as f:
+                    dctx = zstd.ZstdDecompressor(dict_data=zstd.ZstdCompressionDict(f.read()))
+            else:
+                dctx = zstd.ZstdDecompressor()
+
+            # 打开压缩文件，进度条挂在read调用上，不再逐成员轮询tell()
+            with open(self.archive_path, 'rb') as f_raw, \
+                    tqdm.wrapattr(f_raw, "read", total=total_size, desc="Extracting",
+                                  unit='B', unit_scale=True, disable=not self.verbose) as f_in:
+                # 创建解压流（大块读取减少解压调用次数）
+                with dctx.stream_reader(f_in, read_size=1 << 20) as decompressed:
+                    # 使用tarfile打开解压后的数据流，提取循环整体交给C层
+                    # ignore_zeros跨过各分片tar流的结尾零块，支持拼接归档
+                    with tarfile.open(fileobj=decompressed, mode='r|', bufsize=1 << 20,
+                                      ignore_zeros=True) as tar:
+                        tar.extractall(self.extract_dir, filter="data")
 
             print(f"Successfully extracted to {self.extract_dir}")
             return True
@@ -284,20 +367,51 @@ class FastHTMLBatchSplitter:
         self.file_chunks = []
         self.processed_files = 0
 
+    def _scan_tree(self, directory):
+        """
+        递归扫描单个子树，收集HTML文件
+        :param directory: 子树根目录
+        :return: HTML文件路径列表
+        """
+        out = []
+        target_prefix = os.path.normpath(self.target_root)
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not os.path.normpath(entry.path).startswith(target_prefix):
+                                stack.append(entry.path)
+                        elif entry.name.lower().endswith(".html"):
+                            out.append(entry.path)
+            except OSError as e:
+                print(f"\n⚠️ 扫描目录失败: {current} - {str(e)}")
+        return out
+
     def _find_html_files(self):
         """
-        多线程快速扫描HTML文件
+        多线程快速扫描HTML文件：顶层子目录分发给线程池并行递归
         :return: 扫描结果
         """
         print("🚀 正在加速扫描HTML文件...")
+        target_prefix = os.path.normpath(self.target_root)
+        top_dirs = []
         all_files = []
 
+        # 先扫顶层：文件直接收下，子目录作为并行扫描的任务单元
+        with os.scandir(self.source_dir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not os.path.normpath(entry.path).startswith(target_prefix):
+                        top_dirs.append(entry.path)
+                elif entry.name.lower().endswith(".html"):
+                    all_files.append(entry.path)
+
         with ThreadPoolExecutor(max_workers=self.workers) as executor:
-            # 并行遍历目录
-            for root, _, files in os.walk(self.source_dir):
-                if os.path.normpath(root).startswith(os.path.normpath(self.target_root)):
-                    continue
-                all_files.extend(os.path.join(root, f) for f in files if f.lower().endswith('.html'))
+            for files in executor.map(self._scan_tree, top_dirs):
+                all_files.extend(files)
 
         return all_files
 
@@ -324,13 +438,13 @@ class FastHTMLBatchSplitter:
         :return: None
         """
         batch_dir = os.path.join(self.target_root, f"batch_{batch_num + 1:03d}")
+        # 批次目录只创建一次；源和目标同设备，os.rename一个系统调用完成移动
+        os.makedirs(batch_dir, exist_ok=True)
 
         for src_file in files:
             try:
-                rel_path = os.path.relpath(src_file, self.source_dir)
-                dst_file = os.path.join(batch_dir, rel_path)
-                os.makedirs(os.path.dirname(dst_file), exist_ok=True)
-                shutil.move(src_file, dst_file)
+                dst_file = os.path.join(batch_dir, os.path.basename(src_file))
+                os.rename(src_file, dst_file)
                 if pbar:
                     pbar.update(1)
             except Exception as e:
@@ -398,6 +512,8 @@ if __name__ == "__main__":
                             help='保留原始文件(默认删除)')
         parser.add_argument('--verbose', action='store_true',
                             help='显示详细输出')
+        parser.add_argument('--dict', dest='dict_path', default=None,
+                            help='预训练Zstd字典路径(默认自动训练并保存)')
 
         args = parser.parse_args()
 
@@ -408,7 +524,8 @@ if __name__ == "__main__":
             compression_level=args.level,
             max_workers=args.workers,
             keep_original=args.keep,
-            verbose=args.verbose
+            verbose=args.verbose,
+            dict_path=args.dict_path
         )
 
         success = compressor.compress()
@@ -422,6 +539,8 @@ if __name__ == "__main__":
         parser.add_argument('archive', type=str, help='.tar.zst文件路径')
         parser.add_argument('output_dir', type=str, help='解压目标目录')
         parser.add_argument('--verbose', action='store_true', help='显示详细输出')
+        parser.add_argument('--dict', dest='dict_path', default=None,
+                            help='Zstd字典路径(默认在压缩文件旁查找.zdict)')
 
         args = parser.parse_args()
 
@@ -429,7 +548,8 @@ if __name__ == "__main__":
         extractor = ZstdTarExtractor(
             archive_path=args.archive,
             extract_dir=args.output_dir,
-            verbose=args.verbose
+            verbose=args.verbose,
+            dict_path=args.dict_path
         )
 
         success = extractor.extract()